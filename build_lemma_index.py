@@ -0,0 +1,57 @@
+# build_lemma_index.py - 語彙CSVにキャプション内の出現有無（has_hit列）を付与するスクリプト
+
+import argparse
+import json
+import pandas as pd
+import spacy
+# 問題生成時と同じ構成でSpaCyモデルを読み込み、解析済みDocキャッシュも共有する
+from modules.enhanced_question_gen import _EXCLUDED_PIPES, lemma_hits_path, load_caption_docs
+
+
+def build_lemma_index(vocab_path: str, caption_path: str, output_path: str) -> None:
+    """
+    各語彙行について、対応するキャプションに見出し語が実際に出現するかを判定し
+    has_hit列として保存する
+
+    問題生成時に見出し語が見つからない行を試行しなくて済むよう、事前に一度だけ実行する
+    出力先は元の語彙CSVとは別のファイルとし、EnhancedQuestionGeneratorが存在すれば優先して読み込む
+
+    Args:
+        vocab_path (str): 語彙CSVファイルのパス
+        caption_path (str): COCOキャプションJSONファイルのパス
+        output_path (str): 出力先CSVファイルのパス
+    """
+    nlp = spacy.load("en_core_web_sm", exclude=_EXCLUDED_PIPES)
+
+    vocab_df = pd.read_csv(vocab_path)
+    with open(caption_path, "r", encoding="utf-8") as f:
+        caption_dict = {str(item["id"]): item["caption"] for item in json.load(f)["annotations"]}
+
+    # 語彙CSVで参照されているキャプションの解析済みDocから、小文字化した見出し語の集合を作成
+    cap_ids = [cap_id for cap_id in vocab_df["CaptionID"].astype(str).unique() if cap_id in caption_dict]
+    docs = load_caption_docs(nlp, caption_path, caption_dict, keep=set(cap_ids))
+    lemmas_by_caption = {
+        cap_id: {token.lemma_.lower() for token in doc}
+        for cap_id, doc in docs.items()
+    }
+
+    vocab_df["has_hit"] = [
+        word.lower() in lemmas_by_caption.get(cap_id, ())
+        for word, cap_id in zip(vocab_df["Word"], vocab_df["CaptionID"].astype(str))
+    ]
+    vocab_df.to_csv(output_path, index=False)
+
+    print(f"解析したキャプション数: {len(cap_ids)}")
+    print(f"見出し語が出現する語彙: {int(vocab_df['has_hit'].sum())} / {len(vocab_df)}")
+    print(f"保存しました: {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="語彙CSVにhas_hit列を付与する")
+    parser.add_argument("--vocab", default="data/coco_cefr_vocab.csv", help="語彙CSVファイルのパス")
+    parser.add_argument("--captions", default="data/captions_val2017.json", help="COCOキャプションJSONファイルのパス")
+    parser.add_argument("--output", default=None,
+                        help="出力先CSVファイルのパス（省略時は語彙CSVと同じ場所の *_hits.csv）")
+    args = parser.parse_args()
+
+    build_lemma_index(args.vocab, args.captions, args.output or lemma_hits_path(args.vocab))
@@ -1,27 +1,190 @@
 # database/db_manager.py
 
+import os
+import queue
 import sqlite3
 import json
+import threading
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Set, Tuple, Any
 from contextlib import contextmanager
 import logging
 
+# DBファイルごとに保持する接続数の上限
+DEFAULT_POOL_SIZE = int(os.getenv("L_VEIGE_POOL_SIZE", "4"))
+
+# 接続が空くまで待つ最大秒数
+_POOL_TIMEOUT = 30.0
+
+
+class ConnectionPool:
+    """
+    同じDBファイルへのSQLite接続を使い回すための接続プール
+    同じスレッド内で入れ子に取得した場合は同じ接続を返す
+    """
+    
+    def __init__(self, db_path: str, size: int, pragmas: Dict[str, Any]):
+        """
+        ConnectionPoolを初期化（接続は必要になった時点で作成）
+        
+        Args:
+            db_path (str): データベースファイルのパス
+            size (int): 保持する接続数の上限
+            pragmas (Dict[str, Any]): 接続ごとに追加で設定するPRAGMA
+        """
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.pragmas = pragmas
+        self._idle = queue.Queue()
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        新しい接続を作成
+        
+        Returns:
+            sqlite3.Connection: データベース接続
+        """
+        # プール経由で別スレッドに渡るためスレッドチェックは行わない
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # 結果を辞書形式で取得
+        # 読み取りと書き込みが互いを待たないようにWALモードを使用
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+    
+    def acquire(self) -> Tuple[sqlite3.Connection, bool]:
+        """
+        接続を取得（現在のスレッドが取得済みの場合は同じ接続を返す）
+        
+        Returns:
+            Tuple[sqlite3.Connection, bool]: (接続, 最も外側の取得かどうか)
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn, False
+        
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=_POOL_TIMEOUT)
+                except queue.Empty:
+                    raise RuntimeError(f"Timed out waiting for a database connection: {self.db_path}")
+        
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn, True
+    
+    def release(self, conn: sqlite3.Connection) -> None:
+        """
+        取得した接続を返却（最も外側の返却時にプールへ戻す）
+        
+        Args:
+            conn (sqlite3.Connection): acquire() で取得した接続
+        """
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        
+        self._local.conn = None
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+    
+    def close(self) -> None:
+        """
+        待機中の接続を閉じる（使用中の接続は返却時に閉じる）
+        """
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# DBファイル・PRAGMA設定ごとの接続プール（プロセス内で共有）
+_pools: Dict[Tuple[str, Tuple], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(db_path: str, pragmas: Dict[str, Any]) -> Tuple[str, Tuple]:
+    path = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    return path, tuple(sorted(pragmas.items()))
+
+
+def get_connection_pool(db_path: str, pragmas: Optional[Dict[str, Any]] = None) -> ConnectionPool:
+    """
+    DBファイルに対応する共有接続プールを取得（なければ作成）
+    
+    Args:
+        db_path (str): データベースファイルのパス
+        pragmas (Optional[Dict[str, Any]]): 接続ごとに追加で設定するPRAGMA
+        
+    Returns:
+        ConnectionPool: 接続プール
+    """
+    pragmas = pragmas or {}
+    key = _pool_key(db_path, pragmas)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            # インメモリDBは接続ごとに別のDBになるため1接続のみとする
+            size = 1 if db_path == ":memory:" else DEFAULT_POOL_SIZE
+            pool = _pools[key] = ConnectionPool(db_path, size, pragmas)
+        return pool
+
+
+def close_connection_pool(db_path: str, pragmas: Optional[Dict[str, Any]] = None) -> None:
+    """
+    DBファイルに対応する共有接続プールを閉じて破棄
+    
+    Args:
+        db_path (str): データベースファイルのパス
+        pragmas (Optional[Dict[str, Any]]): プール作成時のPRAGMA
+    """
+    with _pools_lock:
+        pool = _pools.pop(_pool_key(db_path, pragmas or {}), None)
+    if pool is not None:
+        pool.close()
+
 class DatabaseManager:
     """
     語彙学習システムのデータベース管理クラス
     SQLiteを使用してユーザー、問題、学習ログなどを管理する
     """
     
-    def __init__(self, db_path: str = "vocabulary_learning.db"):
+    def __init__(self, db_path: str = "vocabulary_learning.db", pragmas: Optional[Dict[str, Any]] = None):
         """
         DatabaseManagerを初期化
         
         Args:
             db_path (str): データベースファイルのパス
+            pragmas (Optional[Dict[str, Any]]): 接続ごとに追加で設定するPRAGMA（例: {"cache_size": -64000}）
         """
         self.db_path = db_path
+        self.pragmas = dict(pragmas or {})
         self.logger = logging.getLogger(__name__)
         self.init_database()
     
@@ -30,18 +193,41 @@ class DatabaseManager:
         """
         データベース接続のコンテキストマネージャー
         トランザクションの自動管理を行う
+        
+        接続は同じDBファイルの共有プールから取得して使い回し、入れ子で呼ばれた場合は
+        最も外側のブロックの終了時にのみコミット・ロールバックする
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # 結果を辞書形式で取得
+        pool = get_connection_pool(self.db_path, self.pragmas)
+        conn, outermost = pool.acquire()
         try:
             yield conn
-            conn.commit()
+            if outermost:
+                conn.commit()
         except Exception as e:
-            conn.rollback()
-            self.logger.error(f"Database error: {e}")
+            if outermost:
+                conn.rollback()
+                self.logger.error(f"Database error: {e}")
             raise
         finally:
-            conn.close()
+            pool.release(conn)
+    
+    @contextmanager
+    def transaction(self):
+        """
+        複数の操作を1つのトランザクションにまとめるコンテキストマネージャー
+        ブロック内のget_connection()は同じ接続を使い、ブロック終了時に1回だけコミットする
+        """
+        with self.get_connection() as conn:
+            if not conn.in_transaction:
+                # 開始時に書き込みロックを取得し、途中でのロック競合を避ける
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+    
+    def close(self) -> None:
+        """
+        このDBファイルの共有接続プールを閉じる（次回アクセス時に作り直す）
+        """
+        close_connection_pool(self.db_path, self.pragmas)
     
     def init_database(self) -> None:
         """
@@ -70,13 +256,19 @@ class DatabaseManager:
                     pos TEXT NOT NULL,
                     cefr TEXT NOT NULL,
                     answer TEXT NOT NULL,
+                    answer_norm TEXT,
                     blank_question TEXT NOT NULL,
+                    blank_offset INTEGER,
+                    blank_length INTEGER,
                     divided TEXT NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     UNIQUE(lemma, pos, cefr)
                 )
             """)
             
+            # 既存DBへの列追加
+            self._migrate_questions_table(cursor)
+            
             # 選択肢管理テーブル
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS choices (
@@ -118,6 +310,15 @@ class DatabaseManager:
                 )
             """)
             
+            # 生成画像の内容ハッシュ管理テーブル（重複画像のハードリンク共有用）
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS image_blobs (
+                    sha TEXT PRIMARY KEY,
+                    canonical_path TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
             # 学習セッション管理テーブル
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS learning_sessions (
@@ -140,9 +341,53 @@ class DatabaseManager:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_learning_logs_session ON learning_logs(session_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_choices_qid ON choices(qid)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_generated_images_qid ON generated_images(qid)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_image_blobs_path ON image_blobs(canonical_path)")
             
         self.logger.info("Database initialized successfully")
     
+    def _reset(self) -> None:
+        """
+        全テーブルのデータを削除（テスト用、スキーマは残す）
+        """
+        with self.get_connection() as conn:
+            conn.executescript("""
+                BEGIN;
+                DELETE FROM learning_logs;
+                DELETE FROM generated_images;
+                DELETE FROM image_blobs;
+                DELETE FROM choices;
+                DELETE FROM learning_sessions;
+                DELETE FROM questions;
+                DELETE FROM users;
+                DELETE FROM sqlite_sequence;
+                COMMIT;
+            """)
+    
+    def _migrate_questions_table(self, cursor: sqlite3.Cursor) -> None:
+        """
+        旧バージョンで作成されたquestionsテーブルに不足している列を追加
+        
+        Args:
+            cursor (sqlite3.Cursor): カーソル
+        """
+        cursor.execute("PRAGMA table_info(questions)")
+        columns = {row['name'] for row in cursor.fetchall()}
+        
+        if 'answer_norm' not in columns:
+            cursor.execute("ALTER TABLE questions ADD COLUMN answer_norm TEXT")
+            cursor.execute("SELECT qid, answer FROM questions")
+            cursor.executemany(
+                "UPDATE questions SET answer_norm = ? WHERE qid = ?",
+                [(row['answer'].strip().lower(), row['qid']) for row in cursor.fetchall()]
+            )
+            self.logger.info("Added answer_norm column to questions table")
+        
+        # 空所の文字位置（旧データはNULLのままとし、トークン列から文を組み立てる）
+        for column in ('blank_offset', 'blank_length'):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE questions ADD COLUMN {column} INTEGER")
+                self.logger.info(f"Added {column} column to questions table")
+    
     # === ユーザー管理 ===
     
     def get_or_create_user(self, username: str) -> int:
@@ -202,14 +447,29 @@ class DatabaseManager:
         Returns:
             int: 問題ID (qid)
         """
+        qid, _ = self.save_question_if_new(question_data)
+        return qid
+    
+    def save_question_if_new(self, question_data: Dict) -> Tuple[Optional[int], bool]:
+        """
+        問題をデータベースに保存し、新規に保存したかどうかも返す
+        同じ (見出し語, 品詞, CEFR) の問題が既にある場合は保存せず既存の問題IDを返す
+        
+        Args:
+            question_data (Dict): 問題データ
+            
+        Returns:
+            Tuple[Optional[int], bool]: (問題ID, 新規に保存した場合True)
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
             try:
                 cursor.execute("""
                     INSERT INTO questions 
-                    (image_id, caption_id, caption, lemma, pos, cefr, answer, blank_question, divided)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    (image_id, caption_id, caption, lemma, pos, cefr, answer, answer_norm,
+                     blank_question, blank_offset, blank_length, divided)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     question_data['image_id'],
                     question_data['id'],
@@ -218,13 +478,16 @@ class DatabaseManager:
                     question_data['pos'],
                     question_data['cefr'],
                     question_data['answer'],
+                    question_data.get('answer_norm') or question_data['answer'].strip().lower(),
                     json.dumps(question_data['blankquestion']),
+                    question_data.get('blank_offset'),
+                    question_data.get('blank_length'),
                     json.dumps(question_data['divided'])
                 ))
                 
                 qid = cursor.lastrowid
                 self.logger.info(f"Saved question: {question_data['lemma']} (QID: {qid})")
-                return qid
+                return qid, True
                 
             except sqlite3.IntegrityError:
                 # 既存の問題が存在する場合、そのqidを返す
@@ -233,7 +496,7 @@ class DatabaseManager:
                     (question_data['lemma'], question_data['pos'], question_data['cefr'])
                 )
                 result = cursor.fetchone()
-                return result['qid'] if result else None
+                return (result['qid'] if result else None), False
     
     def get_question_by_id(self, qid: int) -> Optional[Dict]:
         """
@@ -297,6 +560,39 @@ class DatabaseManager:
             
             return None
     
+    def get_questions_by_criteria_pairs(self, criteria_pairs: List[Tuple[str, str]]) -> List[Dict]:
+        """
+        複数の (品詞, CEFRレベル) の組み合わせに該当する問題を1回のクエリでまとめて取得
+        
+        Args:
+            criteria_pairs (List[Tuple[str, str]]): (品詞, CEFRレベル) のリスト
+            
+        Returns:
+            List[Dict]: 問題データのリスト（問題ID順）
+        """
+        pairs = list(dict.fromkeys((pos.lower(), cefr.upper()) for pos, cefr in criteria_pairs))
+        if not pairs:
+            return []
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""SELECT * FROM questions
+                WHERE (pos, cefr) IN (VALUES {",".join(["(?,?)"] * len(pairs))})
+                ORDER BY qid""",
+                [value for pair in pairs for value in pair]
+            )
+            
+            questions = []
+            for row in cursor.fetchall():
+                question = dict(row)
+                question['blankquestion'] = json.loads(question['blank_question'])
+                question['divided'] = json.loads(question['divided'])
+                del question['blank_question']
+                questions.append(question)
+            
+            return questions
+    
     def question_exists(self, lemma: str, pos: str, cefr: str) -> bool:
         """
         指定された条件の問題が存在するかチェック
@@ -318,6 +614,42 @@ class DatabaseManager:
             result = cursor.fetchone()
             return result['count'] > 0
     
+    def get_lemmas_by_qids(self, qids: List[int]) -> Set[str]:
+        """
+        複数の問題IDの見出し語を1回のクエリでまとめて取得
+        
+        Args:
+            qids (List[int]): 問題IDリスト
+            
+        Returns:
+            Set[str]: 見出し語の集合（存在する問題のみ）
+        """
+        if not qids:
+            return set()
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT lemma FROM questions WHERE qid IN ({','.join('?' * len(qids))})",
+                list(qids)
+            )
+            return {row['lemma'] for row in cursor.fetchall()}
+    
+    def get_question_key_index(self) -> Dict[Tuple[str, str, str], int]:
+        """
+        保存済み問題の (見出し語, 品詞, CEFRレベル) → 問題ID の索引を取得
+        
+        Returns:
+            Dict[Tuple[str, str, str], int]: (lemma, pos, cefr) → qid の辞書
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT qid, lemma, pos, cefr FROM questions")
+            return {
+                (row['lemma'], row['pos'], row['cefr']): row['qid']
+                for row in cursor.fetchall()
+            }
+    
     # === 選択肢管理 ===
     
     def save_choices(self, qid: int, choices: List[str], correct_answer: str) -> None:
@@ -660,7 +992,49 @@ class DatabaseManager:
             )
             result = cursor.fetchone()
             return result['image_path'] if result else None
-    
+
+    def get_image_blob_path(self, sha: str) -> Optional[str]:
+        """
+        画像内容のSHA-256から正規の画像パスを取得
+
+        Args:
+            sha (str): 画像内容のSHA-256（16進文字列）
+
+        Returns:
+            Optional[str]: 正規の画像ファイルパス
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT canonical_path FROM image_blobs WHERE sha = ?", (sha,))
+            result = cursor.fetchone()
+            return result['canonical_path'] if result else None
+
+    def save_image_blob(self, sha: str, canonical_path: str) -> None:
+        """
+        画像内容のSHA-256と正規の画像パスを登録（既存の場合は更新）
+
+        Args:
+            sha (str): 画像内容のSHA-256（16進文字列）
+            canonical_path (str): 正規の画像ファイルパス
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO image_blobs (sha, canonical_path) VALUES (?, ?)",
+                (sha, canonical_path)
+            )
+
+    def delete_image_blobs_by_path(self, canonical_path: str) -> None:
+        """
+        指定パスを正規パスとする登録を削除（ファイルの内容を書き換えた場合に呼び出す）
+
+        Args:
+            canonical_path (str): 正規の画像ファイルパス
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM image_blobs WHERE canonical_path = ?", (canonical_path,))
+
     # === 統計・分析機能 ===
     
     def get_user_statistics(self, user_id: int) -> Dict:
@@ -5,6 +5,7 @@ import os
 import requests
 import hashlib
 import time
+from functools import lru_cache
 from PIL import Image
 from io import BytesIO
 from openai import OpenAI
@@ -13,6 +14,107 @@ import logging
 from typing import Dict, List, Optional, Tuple
 from database.db_manager import DatabaseManager
 
+# 保存形式 → ダウンロード時のContent-Type（一致すれば変換不要）
+_CONTENT_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+}
+
+# 変換不要時のストリーミング書き込み単位
+_COPY_CHUNK_SIZE = 64 * 1024
+
+# 必要最小限の不適切表現除去（lru_cacheのキーにできるようタプルで保持）
+_UNSAFE_WORDS = (
+    ("violent", "peaceful"),
+    ("scary", "calm"),
+    ("dangerous", "safe"),
+    ("blood", "red"),
+    ("weapon", "object"),
+    ("gun", "tool"),
+    ("knife", "utensil"),
+    ("death", "sleep"),
+    ("kill", "stop"),
+    ("hurt", "touch")
+)
+
+
+@lru_cache(maxsize=1024)
+def _remove_unsafe_words(text: str, unsafe_items: Tuple[Tuple[str, str], ...]) -> str:
+    """
+    不適切表現を安全な語に置換（同じ文はリトライ等で繰り返し渡されるためキャッシュ）
+    """
+    safe_text = text.lower()
+    for unsafe, safe in unsafe_items:
+        safe_text = safe_text.replace(unsafe, safe)
+
+    # 元の大文字小文字構造をある程度保持
+    return safe_text.capitalize()
+
+
+@lru_cache(maxsize=1024)
+def _build_prompt(caption: str, lemma: str, selected_answer: str,
+                  unsafe_items: Tuple[Tuple[str, str], ...]) -> str:
+    """
+    誤答を含む文のプロンプトを作成（caption・lemma・誤答の組でキャッシュ）
+    """
+    # 基本的な置換
+    modified_caption = caption.replace(lemma, selected_answer)
+
+    # 不適切表現の除外のみ実行
+    safe_caption = _remove_unsafe_words(modified_caption, unsafe_items)
+
+    # 最もシンプルなプロンプト：「"（学習者の誤答を含む文）"」
+    return f'"{safe_caption}"'
+
+
+def _encode_to_disk(data: bytes, save_path: str, image_format: str, jpeg_quality: int) -> str:
+    """
+    画像バイト列を指定形式で再エンコードして保存し、保存内容のSHA-256を返す
+    """
+    # 最小限の画像処理
+    img = Image.open(BytesIO(data))
+
+    # JPEG入力はデコード時にRGBへ直接変換させ、後段のconvertを不要にする
+    if img.format == "JPEG":
+        img.draft("RGB", img.size)
+
+    # RGB変換（最小限）
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    # 高速保存（最適化無効）
+    buffer = BytesIO()
+    if image_format.upper() == "JPEG":
+        img.save(buffer, "JPEG", quality=jpeg_quality, optimize=False)
+    else:
+        img.save(buffer, "PNG", optimize=False)
+    encoded = buffer.getvalue()
+
+    # 一時ファイルに書いてから置き換える（ハードリンク共有中の画像を上書きしないため）
+    tmp_path = save_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(encoded)
+        os.replace(tmp_path, save_path)
+    finally:
+        # 書き込み失敗時に一時ファイルを残さない（置き換え後は存在しない）
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _file_sha256(path: str) -> str:
+    """
+    ファイル内容のSHA-256を返す
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 class EnhancedImageGenerator:
     """
     データベース連携対応の誤答画像生成クラス（速度最優先版）
@@ -49,6 +151,16 @@ class EnhancedImageGenerator:
         self.image_quality = "standard"  # 最低品質で最高速
         self.image_style = "natural"  # シンプルスタイルで最高速
         self.min_generation_interval = 1  # 最短間隔
+
+        # images.generate の引数（setterで更新される）
+        self._gen_kwargs = {
+            "model": self.image_model,
+            "size": self.image_size,
+            "quality": self.image_quality,
+            "style": self.image_style,
+            "n": 1,
+            "response_format": "url"
+        }
         
         self.logger.info("Using DALL-E 3 with speed-optimized settings")
         
@@ -59,7 +171,8 @@ class EnhancedImageGenerator:
         # キャッシュとレート制限
         self._generation_cache = {}
         self._last_generation_time = 0
-        
+        self._stats_cache = None  # (ディレクトリ署名, 統計値)
+
         # 画像品質設定（速度重視）
         self.image_format = "JPEG"
         self.image_quality_jpeg = 70
@@ -94,16 +207,22 @@ class EnhancedImageGenerator:
         new_image_path = self._generate_new_wrong_image(qid, question_data, selected_answer)
         
         if new_image_path:
-            # データベースに保存
-            self.db_manager.save_generated_image(qid, selected_answer, new_image_path)
-            
-            # キャッシュに保存
-            self._generation_cache[cache_key] = new_image_path
-            
-            self.logger.info(f"Generated and saved new wrong image: {new_image_path}")
+            self._register_generated_image(qid, selected_answer, new_image_path)
         
         return new_image_path
 
+    def _register_generated_image(self, qid: int, selected_answer: str, image_path: str) -> None:
+        """
+        新規生成した画像をデータベースとキャッシュに登録
+        """
+        # データベースに保存
+        self.db_manager.save_generated_image(qid, selected_answer, image_path)
+
+        # キャッシュに保存
+        self._generation_cache[f"image_{qid}_{selected_answer}"] = image_path
+
+        self.logger.info(f"Generated and saved new wrong image: {image_path}")
+
     def _generate_new_wrong_image(self, qid: int, question_data: Dict, 
                                  selected_answer: str) -> Optional[str]:
         """
@@ -127,11 +246,15 @@ class EnhancedImageGenerator:
             relative_path = os.path.join(f"qid_{qid}", image_filename)
             
             # 画像のダウンロードと保存（高速版）
-            success = self._save_image_fast(image_url, full_image_path)
-            if success:
-                return relative_path
-            else:
+            content_sha256 = self._save_image_fast(image_url, full_image_path)
+            if not self._check_saved_file(full_image_path):
                 return None
+            
+            self._deduplicate_image(full_image_path, content_sha256)
+            
+            # 同名ファイルの上書きはmtimeに出ないため統計キャッシュを破棄
+            self._stats_cache = None
+            return relative_path
                 
         except Exception as e:
             self.logger.error(f"Failed to generate wrong image: {e}")
@@ -141,17 +264,9 @@ class EnhancedImageGenerator:
         """
         最小限の安全なプロンプトを作成（「"（誤答を含む文）"」スタイル）
         """
-        base_caption = question_data["caption"]
-        lemma = question_data["lemma"]
-        
-        # 基本的な置換
-        modified_caption = base_caption.replace(lemma, selected_answer)
-        
-        # 不適切表現の除外のみ実行
-        safe_caption = self._remove_inappropriate_content(modified_caption)
-        
-        # 最もシンプルなプロンプト：「"（学習者の誤答を含む文）"」
-        minimal_prompt = f'"{safe_caption}"'
+        minimal_prompt = _build_prompt(
+            question_data["caption"], question_data["lemma"], selected_answer, _UNSAFE_WORDS
+        )
         
         self.logger.debug(f"Generated minimal safe prompt: {minimal_prompt}")
         return minimal_prompt
@@ -160,26 +275,7 @@ class EnhancedImageGenerator:
         """
         不適切表現のみを除外（速度重視の最小限処理）
         """
-        # 必要最小限の不適切表現除去
-        unsafe_words = {
-            "violent": "peaceful",
-            "scary": "calm", 
-            "dangerous": "safe",
-            "blood": "red",
-            "weapon": "object",
-            "gun": "tool",
-            "knife": "utensil",
-            "death": "sleep",
-            "kill": "stop",
-            "hurt": "touch"
-        }
-        
-        safe_text = text.lower()
-        for unsafe, safe in unsafe_words.items():
-            safe_text = safe_text.replace(unsafe, safe)
-        
-        # 元の大文字小文字構造をある程度保持
-        return safe_text.capitalize()
+        return _remove_unsafe_words(text, _UNSAFE_WORDS)
 
     def _generate_image_with_retry(self, prompt: str) -> Optional[str]:
         """
@@ -191,15 +287,7 @@ class EnhancedImageGenerator:
                 self._enforce_rate_limit()
                 
                 # DALL-E 3のAPI呼び出し（速度最優先設定）
-                response = self.client.images.generate(
-                    model="dall-e-3",
-                    prompt=prompt,
-                    size=self.image_size,
-                    quality="standard",  # 最低品質で最高速
-                    style="natural",     # シンプルスタイルで最高速
-                    n=1,
-                    response_format="url"
-                )
+                response = self.client.images.generate(prompt=prompt, **self._gen_kwargs)
                 
                 image_url = response.data[0].url
                 self.logger.info(f"Successfully generated image with DALL-E 3")
@@ -232,10 +320,10 @@ class EnhancedImageGenerator:
         """
         DALL-E 3専用の速度最優先ファイル名を生成
         """
-        # 最小限のハッシュ生成
-        content_hash = hashlib.md5(
-            f"{qid}_{selected_answer}".encode()
-        ).hexdigest()[:6]
+        # 最小限のハッシュ生成（md5より高速なblake2b、3バイト=16進6文字）
+        content_hash = hashlib.blake2b(
+            f"{qid}_{selected_answer}".encode(), digest_size=3
+        ).hexdigest()
         
         # DALL-E 3専用のシンプルなファイル名
         filename = f"d3_q{qid}_ans{content_hash}.{self.image_format.lower()}"
@@ -260,37 +348,75 @@ class EnhancedImageGenerator:
         
         return safe_filename
 
-    def _save_image_fast(self, image_url: str, save_path: str) -> bool:
+    def _save_image_fast(self, image_url: str, save_path: str) -> str:
+        """
+        画像を高速保存（品質より速度重視）し、保存内容のSHA-256を返す
+        """
+        # 画像のダウンロード（タイムアウト短縮）
+        response = requests.get(image_url, timeout=20, stream=True)
+        response.raise_for_status()
+
+        # 保存形式と同じ形式ならデコード・再エンコードせずそのまま書き込む
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type == _CONTENT_TYPES.get(self.image_format.upper()):
+            response.raw.decode_content = True
+            digest = hashlib.sha256()
+            tmp_path = save_path + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in iter(lambda: response.raw.read(_COPY_CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        f.write(chunk)
+                os.replace(tmp_path, save_path)
+            finally:
+                # ダウンロード途中で失敗した場合に一時ファイルを残さない
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            return digest.hexdigest()
+
+        return _encode_to_disk(response.content, save_path, self.image_format, self.image_quality_jpeg)
+
+    def _deduplicate_image(self, save_path: str, content_sha256: str) -> None:
         """
-        画像を高速保存（品質より速度重視）
+        同一内容の画像が既に保存されていればハードリンクに置き換えてディスクを共有する
         """
+        relative_path = os.path.relpath(save_path, self.base_output_dir)
+
+        # このパスは書き換えたばかりなので、以前の内容の正規パスとしての登録は無効
+        self.db_manager.delete_image_blobs_by_path(relative_path)
+
+        canonical_path = self.db_manager.get_image_blob_path(content_sha256)
+        canonical_full_path = os.path.join(self.base_output_dir, canonical_path) if canonical_path else None
+
+        # 正規ファイルが消えている・再生成等で内容が変わっている場合もリンクしない
+        if (not canonical_full_path or not os.path.isfile(canonical_full_path)
+                or _file_sha256(canonical_full_path) != content_sha256):
+            # 初出の内容なら自身を正規パスとして登録
+            self.db_manager.save_image_blob(content_sha256, relative_path)
+            return
+
+        if os.path.samefile(canonical_full_path, save_path):
+            return
+
+        link_path = save_path + ".lnk"
         try:
-            # 画像のダウンロード（タイムアウト短縮）
-            response = requests.get(image_url, timeout=20)
-            response.raise_for_status()
-            
-            # 最小限の画像処理
-            img = Image.open(BytesIO(response.content))
-            
-            # RGB変換（最小限）
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-            
-            # 高速保存（最適化無効）
-            if self.image_format.upper() == "JPEG":
-                img.save(save_path, "JPEG", quality=self.image_quality_jpeg, optimize=False)
-            else:
-                img.save(save_path, "PNG", optimize=False)
-            
-            # 基本的なファイルサイズ確認
-            if os.path.getsize(save_path) > 0:
-                self.logger.debug(f"Fast saved image: {save_path}")
-                return True
-            else:
-                return False
-            
-        except Exception as e:
-            self.logger.error(f"Failed to fast save image: {e}")
+            os.link(canonical_full_path, link_path)
+            os.replace(link_path, save_path)
+            self.logger.debug(f"Deduplicated image {save_path} -> {canonical_full_path}")
+        except OSError as e:
+            # ハードリンク非対応の環境では書き込み済みのコピーをそのまま使う
+            if os.path.exists(link_path):
+                os.remove(link_path)
+            self.logger.debug(f"Hardlink not available, keeping copy for {save_path}: {e}")
+
+    def _check_saved_file(self, save_path: str) -> bool:
+        """
+        保存したファイルの基本的なサイズ確認
+        """
+        if os.path.getsize(save_path) > 0:
+            self.logger.debug(f"Fast saved image: {save_path}")
+            return True
+        else:
             return False
 
     def _validate_image_file(self, image_path: str) -> bool:
@@ -331,22 +457,8 @@ class EnhancedImageGenerator:
         DALL-E 3画像生成の統計情報を取得
         """
         try:
-            total_images = 0
-            total_size = 0
-            dalle3_images = 0
-            
-            for item in os.listdir(self.base_output_dir):
-                if item.startswith("qid_"):
-                    folder_path = os.path.join(self.base_output_dir, item)
-                    if os.path.isdir(folder_path):
-                        for filename in os.listdir(folder_path):
-                            file_path = os.path.join(folder_path, filename)
-                            if os.path.isfile(file_path):
-                                total_images += 1
-                                total_size += os.path.getsize(file_path)
-                                if filename.startswith('d3_'):
-                                    dalle3_images += 1
-            
+            total_images, total_size, dalle3_images = self._scan_generated_images()
+
             return {
                 'total_generated_images': total_images,
                 'dalle3_images': dalle3_images,
@@ -362,6 +474,40 @@ class EnhancedImageGenerator:
             self.logger.error(f"Failed to get stats: {e}")
             return {'error': str(e)}
 
+    def _scan_generated_images(self) -> Tuple[int, int, int]:
+        """
+        生成画像ディレクトリを1回走査して (総画像数, 総サイズ, DALL-E 3画像数) を返す
+        ディレクトリのmtimeが変わらない限り前回の結果を再利用する
+        """
+        with os.scandir(self.base_output_dir) as it:
+            qid_dirs = [e for e in it if e.name.startswith("qid_") and e.is_dir()]
+
+        # ファイルの追加・削除は各qidフォルダのmtimeに反映される
+        signature = (
+            os.stat(self.base_output_dir).st_mtime_ns,
+            tuple(sorted((e.name, e.stat().st_mtime_ns) for e in qid_dirs))
+        )
+        if self._stats_cache is not None and self._stats_cache[0] == signature:
+            return self._stats_cache[1]
+
+        total_images = 0
+        dalle3_images = 0
+        inode_sizes = {}  # ハードリンクで共有している画像のサイズは1回だけ数える
+        for qid_dir in qid_dirs:
+            with os.scandir(qid_dir.path) as it:
+                entries = [e for e in it if e.is_file()]
+            total_images += len(entries)
+            for e in entries:
+                st = e.stat()
+                # WindowsのDirEntry.statはinode番号が0のため、その場合はパスで区別する
+                inode_sizes[(st.st_dev, st.st_ino) if st.st_ino else e.path] = st.st_size
+            dalle3_images += sum(1 for e in entries if e.name.startswith('d3_'))
+        total_size = sum(inode_sizes.values())
+
+        result = (total_images, total_size, dalle3_images)
+        self._stats_cache = (signature, result)
+        return result
+
     def clear_cache(self) -> None:
         """
         画像生成キャッシュをクリア
@@ -378,6 +524,7 @@ class EnhancedImageGenerator:
         """
         if quality in ["standard", "hd"]:
             self.image_quality = quality
+            self._gen_kwargs["quality"] = quality
             self.logger.info(f"DALL-E 3 quality set to: {quality}")
         else:
             raise ValueError("Quality must be 'standard' or 'hd'")
@@ -391,6 +538,7 @@ class EnhancedImageGenerator:
         """
         if style in ["natural", "vivid"]:
             self.image_style = style
+            self._gen_kwargs["style"] = style
             self.logger.info(f"DALL-E 3 style set to: {style}")
         else:
             raise ValueError("Style must be 'natural' or 'vivid'")
@@ -405,6 +553,7 @@ class EnhancedImageGenerator:
         valid_sizes = ["1024x1024", "1024x1792", "1792x1024"]
         if size in valid_sizes:
             self.image_size = size
+            self._gen_kwargs["size"] = size
             self.logger.info(f"DALL-E 3 size set to: {size}")
         else:
             raise ValueError(f"Size must be one of: {valid_sizes}")
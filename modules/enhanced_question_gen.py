@@ -1,13 +1,133 @@
 # modules/enhanced_question_gen.py - 完全ランダム問題生成版
 
+import numpy as np
 import pandas as pd
 import random
+import os
+import copy
+import hashlib
 import json
 import spacy
+from spacy.tokens import Doc, DocBin
 import logging
-from typing import Dict, List, Optional, Set
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from database.db_manager import DatabaseManager
 
+try:
+    import orjson
+except ImportError:  # 未インストールの場合は標準のjsonで読み込む
+    orjson = None
+
+# 該当語彙がない場合の空の行位置配列
+_EMPTY_INDEX = np.array([], dtype=np.intp)
+_EMPTY_WORDS = (np.array([], dtype=str), np.array([], dtype=str))
+
+# 候補キャプションをSpaCyでまとめて解析する単位
+# （最初の数件で成功することが多いため、余分な解析が増えないよう小さめにする）
+_SPACY_BATCH_SIZE = 16
+
+# 読み込まないSpaCyコンポーネント
+# token.pos_ / lemma_ / text しか参照しないため、tagger・attribute_ruler・lemmatizer のみで足りる
+_EXCLUDED_PIPES = ["parser", "ner", "senter"]
+
+# 解析済みDocキャッシュを作成する際のSpaCyバッチサイズ
+# キャッシュには全キャプションを保存するが、メモリ上に保持するのは出題候補のキャプションのみ
+# （全件約2.5万件のDocを保持すると1インスタンスあたり約190MB増えるため）
+_DOCBIN_BATCH_SIZE = 128
+
+# get_question_by_id でキャッシュする問題数
+_QUESTION_CACHE_SIZE = 4096
+
+
+class _UncachedQuestion(Exception):
+    """
+    問題が存在しない・選択肢が未保存の取得結果をLRUキャッシュに保存させないための例外
+    （後から保存される可能性があるため、取得結果は例外に載せて返す）
+    """
+    
+    def __init__(self, question: Optional[Dict]):
+        super().__init__()
+        self.question = question
+
+
+def caption_doc_cache_path(nlp, caption_path: str) -> str:
+    """
+    解析済みDocキャッシュのパスを取得
+    モデル名・バージョン・パイプライン構成が変わると別のキャッシュになるよう、ファイル名に含める
+    （例: data/captions_val2017.json → data/captions_val2017.<キー>.docbin.spacy）
+    """
+    model_key = json.dumps([nlp.meta.get("name"), nlp.meta.get("version"), list(nlp.pipe_names)])
+    digest = hashlib.sha1(model_key.encode("utf-8")).hexdigest()[:12]
+    return f"{os.path.splitext(caption_path)[0]}.{digest}.docbin.spacy"
+
+
+def load_caption_docs(nlp, caption_path: str, caption_dict: Dict[str, str],
+                      keep: Optional[Set[str]] = None) -> Dict[str, Doc]:
+    """
+    キャプションの解析済みDocをDocBinキャッシュから読み込み
+    キャッシュがない・キャプションJSONより古い場合は全件を解析して作成し直す
+    
+    Args:
+        nlp: SpaCyモデル
+        caption_path (str): キャプションJSONファイルのパス
+        caption_dict (Dict[str, str]): キャプションID → キャプションテキストの辞書（JSONの順）
+        keep (Optional[Set[str]]): 返すキャプションID（Noneの場合は全件）
+        
+    Returns:
+        Dict[str, Doc]: キャプションID → 解析済みDocの辞書
+    """
+    logger = logging.getLogger(__name__)
+    cache_path = caption_doc_cache_path(nlp, caption_path)
+    cap_ids = list(caption_dict)
+    
+    def select(docs: Iterable[Doc]) -> Dict[str, Doc]:
+        return {
+            cap_id: doc for cap_id, doc in zip(cap_ids, docs)
+            if keep is None or cap_id in keep
+        }
+    
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(caption_path):
+            doc_bin = DocBin().from_disk(cache_path)
+            # キャプション件数と一致しない場合は作り直す
+            if len(doc_bin) == len(cap_ids):
+                doc_dict = select(doc_bin.get_docs(nlp.vocab))
+                logger.info(f"Loaded {len(doc_dict)} parsed captions from {cache_path}")
+                return doc_dict
+    except Exception as e:
+        # キャッシュなし・破損時は作り直す
+        logger.debug(f"Caption doc cache unavailable: {e}")
+    
+    logger.info(f"Parsing {len(cap_ids)} captions with SpaCy (building doc cache)...")
+    doc_bin = DocBin(store_user_data=False)
+    
+    def parse() -> Iterator[Doc]:
+        for doc in nlp.pipe(caption_dict.values(), batch_size=_DOCBIN_BATCH_SIZE):
+            doc_bin.add(doc)
+            yield doc
+    
+    doc_dict = select(parse())
+    
+    try:
+        doc_bin.to_disk(cache_path)
+        logger.info(f"Saved parsed captions to {cache_path}")
+    except OSError as e:
+        # 書き込めない場合もメモリ上のDocはそのまま使う
+        logger.warning(f"Failed to save caption doc cache: {e}")
+    
+    return doc_dict
+
+
+def lemma_hits_path(vocab_path: str) -> str:
+    """
+    build_lemma_index.py が出力するhas_hit列付き語彙CSVのパスを取得
+    （例: data/coco_cefr_vocab.csv → data/coco_cefr_vocab_hits.csv）
+    """
+    stem, ext = os.path.splitext(vocab_path)
+    return f"{stem}_hits{ext}"
+
 class EnhancedQuestionGenerator:
     """
     データベース連携対応の問題生成クラス
@@ -30,33 +150,58 @@ class EnhancedQuestionGenerator:
         
         # SpaCyモデルの読み込み
         try:
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = spacy.load("en_core_web_sm", exclude=_EXCLUDED_PIPES)
             self.logger.info("SpaCy model loaded successfully")
         except OSError:
             raise RuntimeError("Please install spaCy model: run `python -m spacy download en_core_web_sm`")
         
         # 語彙データの読み込み
-        self.coco_vocab = self._load_vocabulary(vocab_path)
+        self.coco_vocab = self._load_vocabulary(vocab_path, caption_path)
         self.logger.info(f"Loaded {len(self.coco_vocab)} vocabulary entries")
+        self._build_vocab_index()
+        
+        # 語彙サンプリング用の乱数生成器
+        self._rng = np.random.default_rng()
         
         # キャプションデータの読み込み
         self.caption_dict = self._load_captions(caption_path)
         self.logger.info(f"Loaded {len(self.caption_dict)} captions")
         
-        # キャッシュ用の辞書
-        self._question_cache = {}
+        # 解析済みDocの読み込み（ディスクキャッシュ）
+        self.doc_dict = self._load_caption_docs(caption_path)
+        
+        # 既存問題の (見出し語, 品詞, CEFR) → QID 索引（保存時に追記）
+        self._existing_index = self.db_manager.get_question_key_index()
+        
+        # get_available_criteria の結果（語彙データから作成し使い回す）
+        self._criteria_cache = None
+        
+        # 問題ID → 問題データ（選択肢付き）のLRUキャッシュ（選択肢まで揃った問題のみ保存）
+        self._question_lru = lru_cache(maxsize=_QUESTION_CACHE_SIZE)(self._fetch_question)
     
-    def _load_vocabulary(self, vocab_path: str) -> pd.DataFrame:
+    def _load_vocabulary(self, vocab_path: str, caption_path: Optional[str] = None) -> pd.DataFrame:
         """
         語彙CSVファイルを読み込み
         
         Args:
             vocab_path (str): 語彙CSVファイルのパス
+            caption_path (Optional[str]): has_hit列の判定に使ったキャプションJSONファイルのパス
             
         Returns:
             pd.DataFrame: 語彙データフレーム
         """
         try:
+            # build_lemma_index.py で作成したhas_hit列付きのCSVがあればそちらを使用
+            # （元の語彙CSV・キャプションJSONより古い場合は判定が古く、有効な候補を除外しうるため使用しない）
+            hits_path = lemma_hits_path(vocab_path)
+            if os.path.exists(hits_path):
+                sources = [path for path in (vocab_path, caption_path) if path and os.path.exists(path)]
+                if all(os.path.getmtime(hits_path) >= os.path.getmtime(path) for path in sources):
+                    vocab_path = hits_path
+                    self.logger.info(f"Using lemma hit index: {hits_path}")
+                else:
+                    self.logger.warning(f"Lemma hit index is older than vocabulary or caption file, ignoring: {hits_path}")
+            
             vocab_df = pd.read_csv(vocab_path)
             required_columns = ['POS', 'CEFR', 'Word', 'CaptionID', 'ImageID']
             
@@ -64,11 +209,54 @@ class EnhancedQuestionGenerator:
                 if col not in vocab_df.columns:
                     raise ValueError(f"Required column '{col}' not found in vocabulary file")
             
+            if 'has_hit' in vocab_df.columns:
+                vocab_df['has_hit'] = vocab_df['has_hit'].fillna(False).astype(bool)
+            
+            # 品詞・CEFRは正規化したうえでカテゴリ型にする（比較・グループ化を整数コードで行う）
+            vocab_df['POS'] = pd.Categorical(vocab_df['POS'].str.lower())
+            vocab_df['CEFR'] = pd.Categorical(vocab_df['CEFR'].str.upper())
+            
             return vocab_df
         except Exception as e:
             self.logger.error(f"Failed to load vocabulary file: {e}")
             raise
     
+    def _build_vocab_index(self) -> None:
+        """
+        (品詞, CEFR) → 行位置 の索引と列ごとの配列を作成
+        問題生成のたびに語彙全体を文字列比較でフィルタリングしないようにする
+        """
+        # POS・CEFRは読み込み時に正規化済みのカテゴリ型
+        self._groups = self.coco_vocab.groupby(["POS", "CEFR"], observed=True).indices
+        self._pos_groups = self.coco_vocab.groupby("POS", observed=True).indices
+        
+        # has_hit列があれば、出題候補はキャプションに見出し語が出現する行のみとする
+        # （選択肢・条件一覧・統計には全語彙を使うため、索引の絞り込みのみ行う）
+        self._candidate_groups = self._groups
+        if 'has_hit' in self.coco_vocab.columns:
+            hit = self.coco_vocab['has_hit'].to_numpy()
+            self._candidate_groups = {key: idx[hit[idx]] for key, idx in self._groups.items()}
+            self.logger.info(f"Candidate rows with lemma hits: {int(hit.sum())}/{len(hit)}")
+        
+        # 生成処理で参照する列は行単位ではなく列ごとの配列で保持する
+        self._word_arr = self.coco_vocab["Word"].to_numpy()
+        self._caption_id_arr = self.coco_vocab["CaptionID"].astype(str).to_numpy()
+        self._image_id_arr = self.coco_vocab["ImageID"].astype(str).to_numpy()
+        
+        # 選択肢生成用の重複なし語彙（小文字化した配列も併せて保持）
+        self._unique_words_by_key = {key: self._unique_words(idx) for key, idx in self._groups.items()}
+        self._unique_words_by_pos = {key: self._unique_words(idx) for key, idx in self._pos_groups.items()}
+    
+    def _unique_words(self, idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        行位置の語彙を重複なしで取得
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (語彙, 小文字化した語彙)
+        """
+        words = pd.unique(self._word_arr[idx]).astype(str)
+        return words, np.char.lower(words)
+    
     def _load_captions(self, caption_path: str) -> Dict[str, str]:
         """
         COCOキャプションJSONファイルを読み込み
@@ -80,18 +268,62 @@ class EnhancedQuestionGenerator:
             Dict[str, str]: キャプションID → キャプションテキストの辞書
         """
         try:
-            with open(caption_path, "r", encoding="utf-8") as f:
-                caption_json = json.load(f)
+            with open(caption_path, "rb") as f:
+                raw = f.read()
+            caption_json = orjson.loads(raw) if orjson is not None else json.loads(raw)
             
-            caption_dict = {}
-            for item in caption_json["annotations"]:
-                caption_dict[str(item["id"])] = item["caption"]
+            caption_dict = {str(item["id"]): item["caption"] for item in caption_json["annotations"]}
             
             return caption_dict
         except Exception as e:
             self.logger.error(f"Failed to load caption file: {e}")
             raise
     
+    def _load_caption_docs(self, caption_path: str) -> Dict[str, Doc]:
+        """
+        出題候補の語彙が参照するキャプションの解析済みDocを読み込み
+        （それ以外のキャプションは必要になった時点で解析する）
+        
+        Args:
+            caption_path (str): キャプションJSONファイルのパス
+            
+        Returns:
+            Dict[str, Doc]: キャプションID → 解析済みDocの辞書
+        """
+        candidate_idx = list(self._candidate_groups.values())
+        keep = set(self._caption_id_arr[np.concatenate(candidate_idx)].tolist()) if candidate_idx else set()
+        return load_caption_docs(self.nlp, caption_path, self.caption_dict, keep)
+    
+    def _iter_caption_docs(self, items: Iterable[Tuple[str, str, Any]]) -> Iterator[Tuple[Doc, Any]]:
+        """
+        (キャプションID, キャプション, 付随データ) の順に (解析済みDoc, 付随データ) を返す
+        入力は必要な分だけ少しずつ読み進め、キャッシュにないキャプションだけをSpaCyでまとめて解析する
+        """
+        items = iter(items)
+        while True:
+            chunk = list(islice(items, _SPACY_BATCH_SIZE))
+            if not chunk:
+                return
+            
+            uncached = [caption for cap_id, caption, _ in chunk if cap_id not in self.doc_dict]
+            parsed = self.nlp.pipe(uncached, batch_size=_SPACY_BATCH_SIZE)
+            
+            for cap_id, _, context in chunk:
+                doc = self.doc_dict.get(cap_id)
+                yield (doc if doc is not None else next(parsed)), context
+    
+    def _iter_shuffled(self, idx: np.ndarray, limit: int) -> Iterator[int]:
+        """
+        行位置をランダムな順に1件ずつ返す（重複なし、最大limit件）
+        取り出した分だけFisher–Yatesで並べ替えるため、早く成功した場合は全体を並べ替えずに済む
+        """
+        pool = idx.copy()
+        n = len(pool)
+        for i in range(min(limit, n)):
+            j = int(self._rng.integers(i, n))
+            pool[i], pool[j] = pool[j], pool[i]
+            yield pool[i]
+    
     def get_or_generate_question(self, pos_filter: str, cefr_filter: str, 
                                exclude_qids: List[int] = None, 
                                force_new: bool = True,
@@ -118,6 +350,25 @@ class EnhancedQuestionGenerator:
             # データベースに既存かチェック
             existing_qid = self._check_existing_question(new_question)
             
+            if not existing_qid:
+                # 新規問題の場合、データベースに保存
+                qid, created = self.db_manager.save_question_if_new(new_question)
+                new_question['qid'] = qid
+                if qid:
+                    self._existing_index[
+                        (new_question['lemma'], new_question['pos'], new_question['cefr'])
+                    ] = qid
+                
+                if created:
+                    # 選択肢を生成・保存
+                    self._generate_and_save_choices(new_question)
+                    self.logger.info(f"Created new question: QID {qid}, lemma: {new_question['lemma']}")
+                    return new_question
+                
+                # 索引の読み込み後に他のプロセス等が保存していた場合は既存問題として扱う
+                # （選択肢を作り直すと既存の選択肢が置き換わるため）
+                existing_qid = qid
+            
             if existing_qid:
                 # 既存問題の場合、qidを設定して選択肢を取得
                 new_question['qid'] = existing_qid
@@ -126,14 +377,6 @@ class EnhancedQuestionGenerator:
                     new_question['choices'] = choices
                     new_question['candidate'] = [c for c in choices if c != new_question['answer']]
                     self.logger.info(f"Reusing existing question: QID {existing_qid}, lemma: {new_question['lemma']}")
-            else:
-                # 新規問題の場合、データベースに保存
-                qid = self.db_manager.save_question(new_question)
-                new_question['qid'] = qid
-                
-                # 選択肢を生成・保存
-                self._generate_and_save_choices(new_question)
-                self.logger.info(f"Created new question: QID {qid}, lemma: {new_question['lemma']}")
         
         return new_question
 
@@ -155,44 +398,42 @@ class EnhancedQuestionGenerator:
         # セッション内で回答済みの語彙を取得
         excluded_lemmas = self._get_excluded_lemmas_from_session(exclude_qids)
         
-        # 条件に合う語彙をフィルタリング
-        filtered_vocab = self.coco_vocab[
-            (self.coco_vocab["POS"].str.lower() == pos_filter.lower()) &
-            (self.coco_vocab["CEFR"].str.upper() == cefr_filter.upper()) &
-            (~self.coco_vocab["Word"].isin(excluded_lemmas))
-        ]
+        # 条件に合う語彙を索引から取得し、回答済みの語彙を除外
+        candidate_idx = self._candidate_groups.get((pos_filter.lower(), cefr_filter.upper()), _EMPTY_INDEX)
+        if excluded_lemmas and len(candidate_idx) > 0:
+            candidate_idx = candidate_idx[~np.isin(self._word_arr[candidate_idx], list(excluded_lemmas))]
         
-        if filtered_vocab.empty:
+        if len(candidate_idx) == 0:
             self.logger.warning(f"No vocabulary found for {pos_filter} {cefr_filter}")
             return None
         
-        self.logger.info(f"Found {len(filtered_vocab)} candidate vocabularies for {pos_filter} {cefr_filter}")
+        self.logger.info(f"Found {len(candidate_idx)} candidate vocabularies for {pos_filter} {cefr_filter}")
         
         # 完全ランダムサンプリング（データベースの存在は無視）
         attempts = 0
-        max_sample_attempts = min(max_attempts, len(filtered_vocab))
-        
-        # ランダムに語彙をサンプリング（重複なし）
-        sampled_vocab = filtered_vocab.sample(n=max_sample_attempts, replace=False).reset_index(drop=True)
-        
-        for _, row in sampled_vocab.iterrows():
+        max_sample_attempts = min(max_attempts, len(candidate_idx))
+        
+        def iter_candidates() -> Iterator[Tuple[str, str, int]]:
+            # ランダムに語彙をサンプリング（重複なし、必要になった分だけ取り出す）
+            for i in self._iter_shuffled(candidate_idx, max_sample_attempts):
+                # キャプション情報の取得（キャプションが存在する候補のみ）
+                cap_id = self._caption_id_arr[i]
+                original_caption = self.caption_dict.get(cap_id)
+                if original_caption:
+                    yield cap_id, original_caption, i
+        
+        # 解析済みDocの取得（キャッシュ優先、成功した時点で打ち切り）
+        for doc, i in self._iter_caption_docs(iter_candidates()):
             attempts += 1
-            word = row["Word"]
-            
-            # キャプション情報の取得
-            cap_id = str(row["CaptionID"])
-            img_id = str(row["ImageID"])
-            original_caption = self.caption_dict.get(cap_id)
-            
-            if original_caption:
-                # SpaCyによる解析
-                question_data = self._process_caption_with_spacy(
-                    original_caption, word, cap_id, img_id, pos_filter, cefr_filter
-                )
-                
-                if question_data:
-                    self.logger.info(f"Successfully generated question for lemma: {word} (attempt {attempts}/{max_sample_attempts})")
-                    return question_data
+            word = self._word_arr[i]
+            
+            question_data = self._build_question_from_doc(
+                doc, word, self._caption_id_arr[i], self._image_id_arr[i], pos_filter, cefr_filter
+            )
+            
+            if question_data:
+                self.logger.info(f"Successfully generated question for lemma: {word} (attempt {attempts}/{max_sample_attempts})")
+                return question_data
             
             # 進捗ログ
             if attempts % 50 == 0:
@@ -211,20 +452,13 @@ class EnhancedQuestionGenerator:
         Returns:
             Set[str]: 除外する語彙の集合
         """
-        excluded_lemmas = set()
-        
-        if exclude_qids:
-            # セッション内で回答済みの語彙のみ除外
-            for qid in exclude_qids:
-                question = self.db_manager.get_question_by_id(qid)
-                if question:
-                    excluded_lemmas.add(question['lemma'])
-        
-        return excluded_lemmas
+        # セッション内で回答済みの語彙のみ除外
+        return self.db_manager.get_lemmas_by_qids(exclude_qids or [])
 
     def _check_existing_question(self, question_data: Dict) -> Optional[int]:
         """
         同じ語彙・品詞・CEFRの問題がデータベースに存在するかチェック
+        （初期化時に読み込んだ索引を参照し、DBへの問い合わせは行わない）
         
         Args:
             question_data (Dict): 問題データ
@@ -239,23 +473,16 @@ class EnhancedQuestionGenerator:
         if not all([lemma, pos, cefr]):
             return None
         
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT qid FROM questions WHERE lemma = ? AND pos = ? AND cefr = ?",
-                (lemma, pos.lower(), cefr.upper())
-            )
-            result = cursor.fetchone()
-            return result['qid'] if result else None
+        return self._existing_index.get((lemma, pos.lower(), cefr.upper()))
     
-    def _process_caption_with_spacy(self, caption: str, target_word: str, 
-                                   cap_id: str, img_id: str, 
-                                   pos_filter: str, cefr_filter: str) -> Optional[Dict]:
+    def _build_question_from_doc(self, doc: Doc, target_word: str, 
+                                 cap_id: str, img_id: str, 
+                                 pos_filter: str, cefr_filter: str) -> Optional[Dict]:
         """
-        SpaCyを使用してキャプションを処理し、問題データを生成
+        SpaCyで解析済みのキャプションから問題データを生成
         
         Args:
-            caption (str): 元のキャプション
+            doc (Doc): 解析済みのキャプション
             target_word (str): 対象語彙
             cap_id (str): キャプションID
             img_id (str): 画像ID
@@ -265,33 +492,37 @@ class EnhancedQuestionGenerator:
         Returns:
             Optional[Dict]: 問題データ
         """
+        caption = doc.text
+        
         try:
-            doc = self.nlp(caption)
+            target_lower = target_word.lower()
             
-            # divided配列の生成（副詞以外は見出し語に変換）
+            # divided配列（副詞以外は見出し語に変換）と空所付きトークン列を1回の走査で生成
             divided = []
-            for token in doc:
-                if token.pos_ != "ADV":
-                    divided.append(token.lemma_)
-                else:
-                    divided.append(token.text)
-            
-            # 対象語彙を見つけて空所に変換
-            answer_word = None
             blanked_tokens = []
+            answer_word = None
+            blank_spans = []
             
             for token in doc:
-                if token.lemma_.lower() == target_word.lower():
-                    answer_word = token.text
+                text = token.text
+                lemma = token.lemma_
+                divided.append(text if token.pos_ == "ADV" else lemma)
+                
+                if lemma.lower() == target_lower:
+                    answer_word = text
                     blanked_tokens.append("()")
+                    blank_spans.append((token.idx, len(text)))
                 else:
-                    blanked_tokens.append(token.text)
+                    blanked_tokens.append(text)
             
             # 対象語彙が見つからない場合
             if not answer_word:
                 self.logger.debug(f"Target word '{target_word}' not found in caption: {caption}")
                 return None
             
+            # 空所が1つの場合のみ元キャプション上の文字位置を保持（回答の補完に使用）
+            blank_offset, blank_length = blank_spans[0] if len(blank_spans) == 1 else (None, None)
+            
             # 問題データの構築
             question_data = {
                 "image_id": img_id,
@@ -299,7 +530,10 @@ class EnhancedQuestionGenerator:
                 "caption": caption,
                 "divided": divided,
                 "blankquestion": blanked_tokens,
+                "blank_offset": blank_offset,
+                "blank_length": blank_length,
                 "answer": answer_word,
+                "answer_norm": answer_word.strip().lower(),
                 "lemma": target_word,
                 "pos": pos_filter.lower(),
                 "cefr": cefr_filter.upper()
@@ -353,24 +587,19 @@ class EnhancedQuestionGenerator:
         pos = question_data["pos"]
         cefr = question_data["cefr"]
         
+        lemma_lower = lemma.lower()
+        
         # 同じ品詞・CEFRレベルの語彙からランダムに選択
-        similar_vocab = self.coco_vocab[
-            (self.coco_vocab["POS"].str.lower() == pos.lower()) &
-            (self.coco_vocab["CEFR"].str.upper() == cefr.upper()) &
-            (self.coco_vocab["Word"].str.lower() != lemma.lower())
-        ]["Word"].drop_duplicates().tolist()
+        words, lowered = self._unique_words_by_key.get((pos.lower(), cefr.upper()), _EMPTY_WORDS)
+        pool = words[lowered != lemma_lower]
         
-        # ランダムに2つの誤答を選択
-        if len(similar_vocab) >= 2:
-            wrong_choices = random.sample(similar_vocab, 2)
-        else:
+        if len(pool) < 2:
             # 十分な語彙がない場合は、CEFRレベルを無視
-            fallback_vocab = self.coco_vocab[
-                (self.coco_vocab["POS"].str.lower() == pos.lower()) &
-                (self.coco_vocab["Word"].str.lower() != lemma.lower())
-            ]["Word"].drop_duplicates().tolist()
-            
-            wrong_choices = random.sample(fallback_vocab, min(2, len(fallback_vocab)))
+            words, lowered = self._unique_words_by_pos.get(pos.lower(), _EMPTY_WORDS)
+            pool = words[lowered != lemma_lower]
+        
+        # ランダムに2つの誤答を選択
+        wrong_choices = self._rng.choice(pool, size=min(2, len(pool)), replace=False).tolist()
         
         # 正解と誤答を組み合わせてシャッフル
         choices = [question_data["answer"]] + wrong_choices
@@ -381,36 +610,79 @@ class EnhancedQuestionGenerator:
     def get_question_by_id(self, qid: int) -> Optional[Dict]:
         """
         問題IDから問題データを取得（選択肢付き）
+        同じ問題の2回目以降はDBに問い合わせずキャッシュから返す
         
         Args:
             qid (int): 問題ID
             
         Returns:
-            Optional[Dict]: 問題データ
+            Optional[Dict]: 問題データ（呼び出し側で変更できるようコピーを返す）
+        """
+        try:
+            return copy.deepcopy(self._question_lru(qid))
+        except _UncachedQuestion as e:
+            # キャッシュされない取得結果はこの呼び出し専用のためコピー不要
+            return e.question
+    
+    def bulk_get_questions(self, criteria_pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], List[Dict]]:
+        """
+        複数の (品詞, CEFRレベル) の保存済み問題を1回のクエリでまとめて取得
+        
+        Args:
+            criteria_pairs (Iterable[Tuple[str, str]]): (品詞, CEFRレベル) のリスト
+            
+        Returns:
+            Dict[Tuple[str, str], List[Dict]]: (品詞, CEFRレベル) → 問題データのリスト
+            （問題がない組み合わせは空リスト）
+        """
+        grouped = {(pos.lower(), cefr.upper()): [] for pos, cefr in criteria_pairs}
+        for question in self.db_manager.get_questions_by_criteria_pairs(list(grouped)):
+            grouped[(question['pos'], question['cefr'])].append(question)
+        
+        return grouped
+    
+    def _fetch_question(self, qid: int) -> Optional[Dict]:
+        """
+        問題データと選択肢をDBから取得
+        問題がない・選択肢が未保存の場合は _UncachedQuestion を送出し、LRUキャッシュに保存させない
         """
         question = self.db_manager.get_question_by_id(qid)
-        if question:
-            choices = self.db_manager.get_choices_by_qid(qid)
-            if choices:
-                question['choices'] = choices
-                question['candidate'] = [c for c in choices if c != question['answer']]
+        if not question:
+            raise _UncachedQuestion(question)
         
+        choices = self.db_manager.get_choices_by_qid(qid)
+        if not choices:
+            raise _UncachedQuestion(question)
+        
+        question['choices'] = choices
+        question['candidate'] = [c for c in choices if c != question['answer']]
         return question
     
     def get_available_criteria(self) -> Dict[str, List[str]]:
         """
         利用可能な品詞とCEFRレベルの組み合わせを取得
+        語彙データは読み込み後に変わらないため、初回の集計結果を使い回す
         
         Returns:
             Dict[str, List[str]]: 品詞別のCEFRレベルリスト
         """
-        criteria = {}
-        grouped = self.coco_vocab.groupby('POS')['CEFR'].unique()
-        
-        for pos, cefr_levels in grouped.items():
-            criteria[pos.lower()] = sorted(cefr_levels.tolist())
+        if self._criteria_cache is None:
+            criteria = {}
+            grouped = self.coco_vocab.groupby('POS', observed=True)['CEFR'].unique()
+            
+            for pos, cefr_levels in grouped.items():
+                criteria[pos.lower()] = sorted(cefr_levels.tolist())
+            
+            self._criteria_cache = criteria
         
-        return criteria
+        # 呼び出し側で変更してもキャッシュに影響しないようコピーを返す
+        return {pos: list(levels) for pos, levels in self._criteria_cache.items()}
+    
+    def invalidate_criteria_cache(self) -> None:
+        """
+        get_available_criteria のキャッシュを破棄（語彙データを読み込み直した場合に呼び出す）
+        """
+        self._criteria_cache = None
     
     def get_vocabulary_stats(self) -> Dict:
         """
@@ -434,13 +706,19 @@ class EnhancedQuestionGenerator:
         """
         問題生成キャッシュをクリア
         """
-        self._question_cache.clear()
+        self._question_lru.cache_clear()
+        self.invalidate_criteria_cache()
         self.logger.info("Question generation cache cleared")
     
-    def validate_data_integrity(self) -> Dict[str, List[str]]:
+    def validate_data_integrity(self, n_process: int = 1) -> Dict[str, List[str]]:
         """
         データの整合性をチェック
         
+        Args:
+            n_process (int): SpaCy解析に使うプロセス数（-1で全CPU）
+                2以上を指定する場合、macOS・Windowsでは子プロセスがspawnで起動されるため
+                呼び出し元のスクリプトを `if __name__ == "__main__":` で保護すること
+        
         Returns:
             Dict[str, List[str]]: 検出された問題のリスト
         """
@@ -456,13 +734,18 @@ class EnhancedQuestionGenerator:
             if str(cap_id) not in self.caption_dict:
                 issues['missing_captions'].append(str(cap_id))
         
-        # SpaCy処理エラーのチェック
+        # SpaCy処理エラーのチェック（parser・NERは読み込んでいないため品詞・見出し語付与のみ）
         sample_captions = list(self.caption_dict.values())[:50]  # サンプルチェック
-        for caption in sample_captions:
-            try:
-                self.nlp(caption)
-            except Exception as e:
-                issues['spacy_processing_errors'].append(f"Caption: {caption[:50]}... Error: {str(e)}")
+        try:
+            for _ in self.nlp.pipe(sample_captions, n_process=n_process, batch_size=32):
+                pass
+        except Exception:
+            # まとめて解析できなかった場合は1件ずつ解析してエラーのキャプションを特定
+            for caption in sample_captions:
+                try:
+                    self.nlp(caption)
+                except Exception as e:
+                    issues['spacy_processing_errors'].append(f"Caption: {caption[:50]}... Error: {str(e)}")
         
         return issues
 
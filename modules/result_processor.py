@@ -1,6 +1,7 @@
 # modules/result_processor.py
 
 import logging
+import random
 from typing import Dict, Optional
 from database.db_manager import DatabaseManager
 from modules.enhanced_image_gen import EnhancedImageGenerator
@@ -39,7 +40,9 @@ class ResultProcessor:
         """
         # 正解の取得
         correct_answer = question_data.get('answer')
-        is_correct = user_answer.strip().lower() == correct_answer.strip().lower()
+        # 正解は保存時に正規化済み（旧データは都度正規化）
+        correct_norm = question_data.get('answer_norm') or correct_answer.strip().lower()
+        is_correct = user_answer.strip().lower() == correct_norm
         
         # セッション情報の取得
         session_info = self.db_manager.get_session_info(session_id)
@@ -88,7 +91,7 @@ class ResultProcessor:
         
         # 正答文の生成（空所に正解を補完）
         correct_sentence = self._generate_completed_sentence(
-            question_data['blankquestion'], 
+            question_data, 
             result_data['correct_answer']
         )
         
@@ -133,7 +136,7 @@ class ResultProcessor:
         
         # 誤答文の生成（空所に誤答を補完）
         incorrect_sentence = self._generate_completed_sentence(
-            question_data['blankquestion'], 
+            question_data, 
             user_answer
         )
         
@@ -155,23 +158,26 @@ class ResultProcessor:
         self.logger.info(f"Processed incorrect answer for QID {qid}, generated image: {generated_image_path}")
         return feedback
     
-    def _generate_completed_sentence(self, blank_question: list, answer: str) -> str:
+    def _generate_completed_sentence(self, question_data: Dict, answer: str) -> str:
         """
         空所補充問題に回答を補完して完全な文を生成
         
         Args:
-            blank_question (list): 空所を含む問題文のトークンリスト
+            question_data (Dict): 問題データ（空所を含む問題文のトークンリスト・空所の文字位置）
             answer (str): 補完する答え
             
         Returns:
             str: 完成した文
         """
-        completed_tokens = []
-        for token in blank_question:
-            if token == "()":
-                completed_tokens.append(answer)
-            else:
-                completed_tokens.append(token)
+        # 空所の文字位置がある場合は元のキャプションの該当部分だけを置き換える
+        offset = question_data.get('blank_offset')
+        length = question_data.get('blank_length')
+        caption = question_data.get('caption')
+        if offset is not None and length is not None and caption:
+            return caption[:offset] + answer + caption[offset + length:]
+        
+        # 旧データ・空所が複数の場合はトークンから組み立てる
+        completed_tokens = [answer if token == "()" else token for token in question_data['blankquestion']]
         
         # トークンを文に結合（適切なスペース処理）
         completed_sentence = self._join_tokens_to_sentence(completed_tokens)
@@ -190,20 +196,17 @@ class ResultProcessor:
         if not tokens:
             return ""
         
-        sentence = tokens[0]
+        # 区切りと単語を1つのリストに集めてから一度に結合する
+        pieces = [tokens[0]]
         
-        for i, token in enumerate(tokens[1:], 1):
-            # 句読点の前にはスペースを入れない
-            if token in ".,!?;:":
-                sentence += token
-            # アポストロフィの処理
-            elif token.startswith("'") or (i > 0 and tokens[i-1].endswith("'")):
-                sentence += token
+        for prev, token in zip(tokens, tokens[1:]):
+            # 句読点の前・アポストロフィの前後にはスペースを入れない
             # 通常の単語の前にはスペースを入れる
-            else:
-                sentence += " " + token
+            if not (token in ".,!?;:" or token.startswith("'") or prev.endswith("'")):
+                pieces.append(" ")
+            pieces.append(token)
         
-        return sentence
+        return "".join(pieces)
     
     def _save_learning_log(self, user_id: int, session_id: str, qid: int, 
                           selected_choice: str, is_correct: bool, 
@@ -327,7 +330,6 @@ class ResultProcessor:
             ]
         
         # 簡単なランダム選択（実際にはより高度な選択ロジックも可能）
-        import random
         return random.choice(messages)
 
 
@@ -363,35 +365,41 @@ if __name__ == "__main__":
     print(f"Created test session: {session_id}")
     print(f"Test question: {test_question}")
     
-    # 正答テスト
-    print("\n1. Testing correct answer:")
-    correct_result = result_processor.process_user_answer(
-        session_id, test_question['qid'], test_question, "cat"
-    )
-    print(f"  Result type: {correct_result['result_type']}")
-    print(f"  Message: {correct_result['message']}")
-    print(f"  Completed sentence: {correct_result['completed_sentence']}")
-    
-    # 誤答テスト
-    print("\n2. Testing incorrect answer:")
-    incorrect_result = result_processor.process_user_answer(
-        session_id, test_question['qid'], test_question, "dog"
-    )
-    print(f"  Result type: {incorrect_result['result_type']}")
-    print(f"  Message: {incorrect_result['message']}")
-    print(f"  Completed sentence: {incorrect_result['completed_sentence']}")
-    print(f"  Image generated: {incorrect_result['image_available']}")
+    # 正答・誤答テスト
+    answer_cases = [
+        ("correct", "cat"),
+        ("incorrect", "dog")
+    ]
     
-    # セッション概要テスト
-    print("\n3. Session summary:")
-    summary = result_processor.get_session_summary(session_id)
-    print(f"  Progress: {summary['current_question']}/{summary['total_questions']}")
-    print(f"  Progress rate: {summary['progress_rate']}%")
-    print(f"  Answered questions: {summary['answered_questions']}")
+    # 誤答画像の生成（DALL-E呼び出し）は書き込みロックを保持しないよう、トランザクションの前に済ませる
+    # （回答処理ではメモリキャッシュ済みの画像パスが使われる）
+    for label, answer in answer_cases:
+        if answer.strip().lower() != test_question['answer'].strip().lower():
+            image_generator.get_or_generate_wrong_image(test_question['qid'], test_question, answer)
     
-    # 完了チェックテスト
-    print("\n4. Session completion check:")
-    is_completed = result_processor.check_session_completion(session_id)
-    print(f"  Session completed: {is_completed}")
+    # 以降のDB書き込みは1つのトランザクションでまとめてコミット
+    with db_manager.transaction():
+        for number, (label, answer) in enumerate(answer_cases, 1):
+            print(f"\n{number}. Testing {label} answer:")
+            result = result_processor.process_user_answer(
+                session_id, test_question['qid'], test_question, answer
+            )
+            print(f"  Result type: {result['result_type']}")
+            print(f"  Message: {result['message']}")
+            print(f"  Completed sentence: {result['completed_sentence']}")
+            if 'image_available' in result:  # 誤答時のみ
+                print(f"  Image generated: {result['image_available']}")
+        
+        # セッション概要テスト
+        print("\n3. Session summary:")
+        summary = result_processor.get_session_summary(session_id)
+        print(f"  Progress: {summary['current_question']}/{summary['total_questions']}")
+        print(f"  Progress rate: {summary['progress_rate']}%")
+        print(f"  Answered questions: {summary['answered_questions']}")
+        
+        # 完了チェックテスト
+        print("\n4. Session completion check:")
+        is_completed = result_processor.check_session_completion(session_id)
+        print(f"  Session completed: {is_completed}")
     
     print("\n=== Test completed ===")
\ No newline at end of file
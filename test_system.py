@@ -1,39 +1,217 @@
 # test_system.py - システム総合テストスクリプト
 
+import io
 import os
 import sys
 import json
-import pandas as pd
+import threading
+import atexit
+import shutil
+import tempfile
+import importlib
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
 from pathlib import Path
 
+# 標準ライブラリのみに依存するため先頭で読み込む
+# （SpaCy・OpenAI等に依存するモジュールは読み込み失敗を個別に報告できるよう test_imports で読み込む）
+from database.db_manager import DatabaseManager
+
+try:
+    import pytest
+except ImportError:  # スクリプトとして実行する場合はpytestなしでも動作させる
+    pytest = None
+
+# 大きなキャプションJSONはijsonで逐次読み込む（未インストールの場合は一括読み込み）
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# これを超えるサイズのJSONを逐次読み込みの対象とする
+STREAMING_JSON_THRESHOLD = 10 * 1024 * 1024
+
+# ファイル構造テストで存在を確認するファイル
+REQUIRED_FILES = (
+    'app.py',
+    '.env',
+    'data/captions_val2017_sample10.json',
+    'data/coco_cefr_vocab.csv',
+    'database/db_manager.py',
+    'modules/enhanced_question_gen.py',
+    'modules/enhanced_candidate_gen.py',
+    'modules/enhanced_image_gen.py',
+    'modules/result_processor.py',
+    'templates/base.html',
+    'templates/login.html',
+    'templates/question.html',
+    'templates/result.html',
+    'static/placeholder.jpg'
+)
+
+# インポートテストの対象（モジュール名, クラス名）
+MODULES_TO_TEST = (
+    ('database.db_manager', 'DatabaseManager'),
+    ('modules.enhanced_question_gen', 'EnhancedQuestionGenerator'),
+    ('modules.enhanced_candidate_gen', 'EnhancedCandidateGenerator'),
+    ('modules.enhanced_image_gen', 'EnhancedImageGenerator'),
+    ('modules.result_processor', 'ResultProcessor')
+)
+
+# ファイル構造テストの入力（エントリの追加・削除で更新時刻が変わるディレクトリ）
+# テスト内容や対象ファイルの変更でも再実行されるよう、このスクリプト自体も含める
+FILE_STRUCTURE_INPUTS = tuple(sorted({os.path.dirname(p) or '.' for p in REQUIRED_FILES} | {'static/images'})) + (__file__,)
+
+# データ整合性テストの入力
+DATA_INTEGRITY_INPUTS = ('data/captions_val2017_sample10.json', 'data/coco_cefr_vocab.csv', __file__)
+
+# 入力の更新時刻が前回と同じテストの結果を再利用するためのキャッシュ
+TEST_CACHE_FILE = '.test_cache.json'
+
+# スクリプトとして実行した場合のみ有効（pytestでは常にテストを実行）
+_test_cache_enabled = False
+_test_cache_lock = threading.Lock()
+
+# テスト用DBの設定（WAL・synchronous=NORMALはDatabaseManagerの既定）
+TEST_DB_PRAGMAS = {"temp_store": "memory", "cache_size": -64000}
+
+def _create_test_db_manager(db_path):
+    """
+    テスト用DatabaseManagerを作成
+    """
+    return DatabaseManager(db_path, pragmas=TEST_DB_PRAGMAS)
+
+if pytest is not None:
+    @pytest.fixture(scope="module")
+    def db_manager(tmp_path_factory):
+        """
+        モジュール内のテストで共有するテスト用DatabaseManager（スキーマ作成は1回のみ）
+        """
+        manager = _create_test_db_manager(str(tmp_path_factory.mktemp("db") / "test_vocabulary.db"))
+        yield manager
+        manager.close()
+
+@lru_cache(maxsize=1)
+def _shared_db_manager():
+    """
+    スクリプト実行時に全テストで共有するテスト用DatabaseManager（一時ディレクトリに1つだけ作成）
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="l_veige_test_")
+    manager = _create_test_db_manager(os.path.join(tmp_dir, "test_vocabulary.db"))
+    # 終了時に接続を閉じてから一時ディレクトリを削除（atexitは登録と逆順に実行）
+    atexit.register(shutil.rmtree, tmp_dir, True)
+    atexit.register(manager.close)
+    return manager
+
+def _mtimes(paths):
+    """
+    パスごとの更新時刻（ns）のリスト（存在しない場合はNone）
+    """
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return mtimes
+
+def _load_test_cache():
+    try:
+        with open(TEST_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def cached_by_mtimes(paths):
+    """
+    入力ファイルの更新時刻が前回実行時と同じ場合、テストを実行せず前回の結果を返すデコレータ
+    失敗時は原因を毎回表示できるよう、合格した結果のみ保存する
+    
+    Args:
+        paths (tuple): テストが参照する入力ファイル・ディレクトリ
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _test_cache_enabled:
+                return func(*args, **kwargs)
+            
+            mtimes = _mtimes(paths)
+            with _test_cache_lock:
+                entry = _load_test_cache().get(func.__name__)
+            if entry is not None and entry.get('result') and entry.get('mtimes') == mtimes:
+                print(f"\n=== {func.__name__}: 入力に変更がないため前回の結果を再利用 (合格) ===")
+                return True
+            
+            result = func(*args, **kwargs)
+            
+            with _test_cache_lock:
+                cache = _load_test_cache()
+                if result:
+                    cache[func.__name__] = {'mtimes': mtimes, 'result': True}
+                elif cache.pop(func.__name__, None) is None:
+                    return result
+                # 上書き保存（置き換えるとカレントディレクトリの更新時刻が変わるため）
+                with open(TEST_CACHE_FILE, 'w') as f:
+                    json.dump(cache, f)
+            return result
+        return wrapper
+    return decorator
+
+def clear_test_cache():
+    """
+    テスト結果のキャッシュを削除
+    """
+    try:
+        os.remove(TEST_CACHE_FILE)
+    except FileNotFoundError:
+        pass
+
+def _list_dir(directory):
+    """
+    ディレクトリ内のエントリ名を1回のscandirで取得（存在しない場合はNone）
+    """
+    try:
+        with os.scandir(directory) as it:
+            return [entry.name for entry in it]
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+def _build_manifest(directories):
+    """
+    指定ディレクトリ直下のエントリを 'ディレクトリ/名前' 形式のパス集合として取得
+    """
+    present = set()
+    for directory in directories:
+        entries = _list_dir(directory)
+        if entries is not None:
+            present.update(name if directory == '.' else f"{directory}/{name}" for name in entries)
+    return present
+
+@lru_cache(maxsize=1)
+def _present_files():
+    """
+    REQUIRED_FILES の親ディレクトリ直下に存在するパスの集合（プロセス内で1回だけ作成）
+    """
+    return frozenset(_build_manifest({os.path.dirname(p) or '.' for p in REQUIRED_FILES}))
+
+@cached_by_mtimes(FILE_STRUCTURE_INPUTS)
 def test_file_structure():
     """
     ファイル構造をテスト
     """
     print("=== 1. ファイル構造テスト ===")
     
-    required_files = [
-        'app.py',
-        '.env',
-        'data/captions_val2017_sample10.json',
-        'data/coco_cefr_vocab.csv',
-        'database/db_manager.py',
-        'modules/enhanced_question_gen.py',
-        'modules/enhanced_candidate_gen.py',
-        'modules/enhanced_image_gen.py',
-        'modules/result_processor.py',
-        'templates/base.html',
-        'templates/login.html',
-        'templates/question.html',
-        'templates/result.html',
-        'static/placeholder.jpg'
-    ]
-    
     missing_files = []
     existing_files = []
     
-    for file_path in required_files:
-        if os.path.exists(file_path):
+    # 必要なディレクトリ直下のパスの集合と照合し、ファイルごとのstatを省く
+    # （リポジトリ全体を再帰的に走査すると.gitや仮想環境まで辿るため対象ディレクトリに限定）
+    present = _present_files()
+    
+    for file_path in REQUIRED_FILES:
+        if file_path in present:
             existing_files.append(file_path)
             print(f"✓ {file_path}")
         else:
@@ -43,52 +221,159 @@ def test_file_structure():
     # 画像ファイルの確認
     print("\n画像ファイルの確認:")
     image_dir = "static/images"
-    if os.path.exists(image_dir):
-        image_files = [f for f in os.listdir(image_dir) if f.endswith('.jpg')]
-        print(f"✓ 画像ディレクトリ存在: {len(image_files)}個のJPGファイル")
-        for img in image_files[:5]:  # 最初の5個だけ表示
+    try:
+        # 件数と先頭5個の名前だけを保持し、ファイル名の一覧は作らない
+        image_count = 0
+        preview = []
+        with os.scandir(image_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.jpg') and entry.is_file():
+                    image_count += 1
+                    if len(preview) < 5:
+                        preview.append(entry.name)
+        
+        print(f"✓ 画像ディレクトリ存在: {image_count}個のJPGファイル")
+        for img in preview:  # 最初の5個だけ表示
             print(f"  - {img}")
-        if len(image_files) > 5:
-            print(f"  ... 他{len(image_files)-5}個")
-    else:
+        if image_count > 5:
+            print(f"  ... 他{image_count-5}個")
+    except (FileNotFoundError, NotADirectoryError):
         print(f"✗ 画像ディレクトリが見つかりません: {image_dir}")
         missing_files.append(image_dir)
     
     print(f"\n結果: {len(existing_files)}個のファイルが存在, {len(missing_files)}個が不足")
     return len(missing_files) == 0
 
+# pandas・numpy・pyarrowは読み込みに時間がかかるため、使用するテストの中で初めて読み込む
+# （データ整合性テストの結果がキャッシュから返る場合は読み込まずに済む）
+@lru_cache(maxsize=None)
+def _ujson_loads():
+    """
+    pandas同梱のujsonのloads関数を取得（pandas 2.2未満は名前が異なる）
+    """
+    try:
+        from pandas.io.json import ujson_loads
+    except ImportError:
+        try:
+            from pandas.io.json import loads as ujson_loads
+        except ImportError:
+            ujson_loads = json.loads
+    return ujson_loads
+
+@lru_cache(maxsize=None)
+def _pyarrow_json():
+    """
+    pyarrow.jsonモジュールを取得（未インストールの場合はNone）
+    """
+    try:
+        import pyarrow.json as pa_json
+    except ImportError:
+        return None
+    return pa_json
+
+def _read_caption_ids(caption_path):
+    """
+    キャプションJSONから画像数とキャプションIDの配列を取得
+    大きなファイルはアノテーション全体を辞書として展開せずに逐次読み込む
+    
+    Returns:
+        tuple: (画像数, キャプションIDの配列)
+    """
+    import numpy as np
+    
+    # pyarrowがあれば列指向で読み込む
+    if _pyarrow_json() is not None:
+        try:
+            return _read_caption_ids_arrow(caption_path)
+        except Exception:
+            pass  # 想定外の構造などで読み込めない場合は従来の方法で読み込む
+    
+    if ijson is not None and os.path.getsize(caption_path) > STREAMING_JSON_THRESHOLD:
+        with open(caption_path, 'rb') as f:
+            image_count = sum(1 for _ in ijson.items(f, 'images.item'))
+            f.seek(0)
+            caption_ids = np.fromiter(
+                (ann['id'] for ann in ijson.items(f, 'annotations.item')), dtype=np.int64
+            )
+        return image_count, caption_ids
+    
+    with open(caption_path, 'r') as f:
+        caption_data = _ujson_loads()(f.read())
+    annotations = caption_data['annotations']
+    caption_ids = np.fromiter((ann['id'] for ann in annotations), dtype=np.int64, count=len(annotations))
+    return len(caption_data.get('images', [])), caption_ids
+
+def _read_caption_ids_arrow(caption_path):
+    """
+    pyarrowでキャプションJSONを読み込み、画像数とキャプションIDの配列を取得
+    COCO形式はファイル全体が1つのオブジェクトのため、1行分がブロックに収まるようにする
+    
+    Returns:
+        tuple: (画像数, キャプションIDの配列)
+    """
+    import numpy as np
+    
+    pa_json = _pyarrow_json()
+    read_options = pa_json.ReadOptions(block_size=os.path.getsize(caption_path) + 1)
+    table = pa_json.read_json(caption_path, read_options=read_options)
+    
+    annotations = table.column('annotations').combine_chunks().flatten()
+    caption_ids = annotations.field('id').to_numpy(zero_copy_only=False).astype(np.int64, copy=False)
+    
+    image_count = 0
+    if 'images' in table.column_names:
+        image_count = len(table.column('images').combine_chunks().flatten())
+    return image_count, caption_ids
+
+def _category_counts(series):
+    """
+    カテゴリ型の列の値ごとの件数を整数コードの集計で取得
+    """
+    import numpy as np
+    
+    codes = series.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))  # 欠損値(-1)は除外
+    return dict(zip(series.cat.categories.tolist(), counts.tolist()))
+
+@cached_by_mtimes(DATA_INTEGRITY_INPUTS)
 def test_data_integrity():
     """
     データファイルの整合性をテスト
     """
     print("\n=== 2. データ整合性テスト ===")
     
+    import numpy as np
+    import pandas as pd
+    
     try:
         # キャプションデータの確認
-        with open('data/captions_val2017_sample10.json', 'r') as f:
-            caption_data = json.load(f)
+        image_count, caption_ids = _read_caption_ids('data/captions_val2017_sample10.json')
         
         print(f"✓ キャプションデータ読み込み成功")
-        print(f"  - 画像数: {len(caption_data.get('images', []))}")
-        print(f"  - キャプション数: {len(caption_data.get('annotations', []))}")
+        print(f"  - 画像数: {image_count}")
+        print(f"  - キャプション数: {caption_ids.size}")
         
         # 語彙データの確認
-        vocab_df = pd.read_csv('data/coco_cefr_vocab.csv')
+        # 使用する列のみ、品詞・CEFRはカテゴリ型で読み込む
+        vocab_df = pd.read_csv(
+            'data/coco_cefr_vocab.csv',
+            usecols=['POS', 'CEFR', 'CaptionID'],
+            dtype={'CaptionID': 'int32', 'POS': 'category', 'CEFR': 'category'}
+        )
         print(f"✓ 語彙データ読み込み成功")
         print(f"  - 総語彙数: {len(vocab_df)}")
-        print(f"  - 品詞: {vocab_df['POS'].value_counts().to_dict()}")
-        print(f"  - CEFR: {vocab_df['CEFR'].value_counts().to_dict()}")
+        print(f"  - 品詞: {_category_counts(vocab_df['POS'])}")
+        print(f"  - CEFR: {_category_counts(vocab_df['CEFR'])}")
         
         # データの整合性確認
-        caption_ids = set(ann['id'] for ann in caption_data['annotations'])
-        vocab_caption_ids = set(vocab_df['CaptionID'].unique())
-        vocab_caption_ids.discard(0)  # プレースホルダーを除外
+        vocab_caption_ids = vocab_df['CaptionID'].to_numpy()
+        vocab_caption_ids = vocab_caption_ids[vocab_caption_ids != 0]  # プレースホルダーを除外
         
-        matching_ids = caption_ids.intersection(vocab_caption_ids)
-        print(f"✓ データ整合性: {len(matching_ids)}個のキャプションIDが一致")
+        matching_ids = np.intersect1d(caption_ids, vocab_caption_ids)
+        print(f"✓ データ整合性: {matching_ids.size}個のキャプションIDが一致")
         
-        if len(matching_ids) > 0:
-            print("  一致するキャプションID例:", list(matching_ids)[:3])
+        if matching_ids.size > 0:
+            print("  一致するキャプションID例:", matching_ids[:3].tolist())
         
         return True
         
@@ -114,7 +399,7 @@ def test_environment():
             if env_var == 'FLASK_SECRET_KEY':
                 print(f"✓ {env_var}: 設定済み (長さ: {len(value)})")
             elif env_var == 'OPENAI_API_KEY':
-                masked = value[:8] + '*' * (len(value) - 12) + value[-4:]
+                masked = f"{value[:8]}{'*' * (len(value) - 12)}{value[-4:]}"
                 print(f"✓ {env_var}: {masked}")
         else:
             print(f"✗ {env_var}: 未設定")
@@ -128,20 +413,13 @@ def test_imports():
     """
     print("\n=== 4. モジュールインポートテスト ===")
     
-    modules_to_test = [
-        ('database.db_manager', 'DatabaseManager'),
-        ('modules.enhanced_question_gen', 'EnhancedQuestionGenerator'),
-        ('modules.enhanced_candidate_gen', 'EnhancedCandidateGenerator'),
-        ('modules.enhanced_image_gen', 'EnhancedImageGenerator'),
-        ('modules.result_processor', 'ResultProcessor')
-    ]
-    
     import_errors = []
     
-    for module_name, class_name in modules_to_test:
+    for module_name, class_name in MODULES_TO_TEST:
         try:
-            module = __import__(module_name, fromlist=[class_name])
-            getattr(module, class_name)
+            module = importlib.import_module(module_name)
+            if not inspect.isclass(getattr(module, class_name, None)):
+                raise ImportError(f"class '{class_name}' not found")
             print(f"✓ {module_name}.{class_name}")
         except Exception as e:
             print(f"✗ {module_name}.{class_name}: {e}")
@@ -149,24 +427,15 @@ def test_imports():
     
     return len(import_errors) == 0
 
-def test_database_creation():
+def test_database_creation(db_manager):
     """
     データベース作成をテスト
     """
     print("\n=== 5. データベース作成テスト ===")
     
     try:
-        # テスト用データベースファイル
-        test_db_path = "test_vocabulary.db"
-        
-        # 既存のテストDBを削除
-        if os.path.exists(test_db_path):
-            os.remove(test_db_path)
-        
-        from database.db_manager import DatabaseManager
-        
-        # データベース初期化
-        db_manager = DatabaseManager(test_db_path)
+        # 前のテストのデータを削除（スキーマはそのまま）
+        db_manager._reset()
         print("✓ データベース初期化成功")
         
         # テストユーザー作成
@@ -177,32 +446,24 @@ def test_database_creation():
         session_id = db_manager.create_learning_session(user_id, "learning", "noun", "A1")
         print(f"✓ セッション作成成功: {session_id}")
         
-        # クリーンアップ
-        os.remove(test_db_path)
-        print("✓ テストデータベース削除完了")
-        
         return True
         
     except Exception as e:
         print(f"✗ データベーステスト失敗: {e}")
         return False
 
-def test_question_generation():
+def test_question_generation(db_manager):
     """
     問題生成をテスト
     """
     print("\n=== 6. 問題生成テスト ===")
     
     try:
-        from database.db_manager import DatabaseManager
         from modules.enhanced_question_gen import EnhancedQuestionGenerator
         
-        # テスト用データベース
-        test_db_path = "test_question_gen.db"
-        if os.path.exists(test_db_path):
-            os.remove(test_db_path)
+        # 前のテストのデータを削除（スキーマはそのまま）
+        db_manager._reset()
         
-        db_manager = DatabaseManager(test_db_path)
         question_gen = EnhancedQuestionGenerator(db_manager)
         
         print("✓ 問題生成モジュール初期化成功")
@@ -211,44 +472,107 @@ def test_question_generation():
         criteria = question_gen.get_available_criteria()
         print(f"✓ 利用可能な条件: {len(criteria)}種類の品詞")
         
-        # 問題生成テスト
-        for pos in list(criteria.keys())[:2]:  # 最初の2つの品詞でテスト
-            for cefr in criteria[pos][:2]:  # 最初の2つのCEFRレベルでテスト
-                try:
-                    question = question_gen.get_or_generate_question(pos, cefr)
-                    if question:
-                        print(f"✓ 問題生成成功: {pos} {cefr} - {question.get('lemma', 'N/A')}")
-                    else:
-                        print(f"- 問題生成なし: {pos} {cefr}")
-                except Exception as e:
-                    print(f"✗ 問題生成エラー {pos} {cefr}: {e}")
+        # 問題生成テスト（最初の2つの品詞 × 最初の2つのCEFRレベル）
+        combos = [(pos, cefr) for pos in list(criteria.keys())[:2] for cefr in criteria[pos][:2]]
+        
+        def generate(combo):
+            try:
+                return question_gen.get_or_generate_question(*combo), None
+            except Exception as e:
+                return None, e
+        
+        # 条件ごとの生成は独立しているためスレッドで並行実行し、結果は条件の順に表示
+        with ThreadPoolExecutor(max_workers=max(1, min(4, len(combos)))) as executor:
+            for (pos, cefr), (question, error) in zip(combos, executor.map(generate, combos)):
+                if error is not None:
+                    print(f"✗ 問題生成エラー {pos} {cefr}: {error}")
+                elif question:
+                    print(f"✓ 問題生成成功: {pos} {cefr} - {question.get('lemma', 'N/A')}")
+                else:
+                    print(f"- 問題生成なし: {pos} {cefr}")
+        
+        # 生成した問題が保存されているか、全条件分を1回のクエリで確認
+        saved = question_gen.bulk_get_questions(combos)
+        print(f"✓ 保存済み問題: {sum(len(questions) for questions in saved.values())}問 "
+              f"({sum(1 for questions in saved.values() if questions)}/{len(saved)}条件)")
         
-        # クリーンアップ
-        os.remove(test_db_path)
         return True
         
     except Exception as e:
         print(f"✗ 問題生成テスト失敗: {e}")
         return False
 
+class _ThreadLocalStdout:
+    """
+    スレッドごとに出力先を切り替えるstdoutの代理
+    並行実行したテストの出力が混ざらないよう、テストごとにバッファへ書き込む
+    """
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+    
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer if buffer is not None else self._stream).write(text)
+    
+    def flush(self):
+        self._stream.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+    
+    def run_captured(self, test_name, test_func):
+        """
+        テストを実行し、(結果, 出力) を返す
+        """
+        self._local.buffer = io.StringIO()
+        try:
+            try:
+                result = test_func()
+            except Exception as e:
+                print(f"✗ {test_name}テストで予期しないエラー: {e}")
+                result = False
+            return result, self._local.buffer.getvalue()
+        finally:
+            self._local.buffer = None
+
 def run_all_tests():
     """
     全てのテストを実行
     """
     print("🎯 語彙学習システム総合テスト開始\n")
     
-    tests = [
+    # 互いに独立した読み取りのみのテスト（並行実行）
+    io_tests = [
         ("ファイル構造", test_file_structure),
         ("データ整合性", test_data_integrity),
         ("環境変数", test_environment),
-        ("モジュールインポート", test_imports),
-        ("データベース作成", test_database_creation),
-        ("問題生成", test_question_generation)
+        ("モジュールインポート", test_imports)
+    ]
+    
+    # DBに書き込むテスト（順番に実行）
+    db_tests = [
+        ("データベース作成", lambda: test_database_creation(_shared_db_manager())),
+        ("問題生成", lambda: test_question_generation(_shared_db_manager()))
     ]
     
     results = {}
     
-    for test_name, test_func in tests:
+    proxy = _ThreadLocalStdout(sys.stdout)
+    sys.stdout = proxy
+    try:
+        with ThreadPoolExecutor(max_workers=len(io_tests)) as executor:
+            outcomes = list(executor.map(lambda test: proxy.run_captured(*test), io_tests))
+    finally:
+        sys.stdout = proxy._stream
+    
+    # 出力はテストの定義順に表示
+    for (test_name, _), (result, output) in zip(io_tests, outcomes):
+        sys.stdout.write(output)
+        results[test_name] = result
+    
+    for test_name, test_func in db_tests:
         try:
             results[test_name] = test_func()
         except Exception as e:
@@ -279,4 +603,10 @@ def run_all_tests():
     return passed == total
 
 if __name__ == "__main__":
+    # --no-cache: 前回の結果を破棄して全テストを実行
+    if "--no-cache" in sys.argv[1:]:
+        clear_test_cache()
+    else:
+        _test_cache_enabled = True
+    
     run_all_tests()
\ No newline at end of file